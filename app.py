@@ -3,7 +3,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import time
 from main import (
-    load_data, evaluate, generate_population,
+    load_data, evaluate, evaluate_fitness, generate_population, analisis_kelayakan,
+    buat_arsip_surrogate, generasi_dua_tahap, evaluasi_populasi_objektif, nsga2_generasi, pareto_front,
     crossover, mutate, roulette_selection, set_params, calculate_unloading_time
 )
 from visualisasi import visualisasi_penyusunan
@@ -21,6 +22,49 @@ def highlight_status(row):
         return ["background-color: #ff0000"] * len(row)
     return [""] * len(row)
 
+def simpan_hasil(best_coords, boxes, dimensi):
+    panjang, lebar, tinggi = dimensi
+    total_unloading_time, unloading_details = calculate_unloading_time(best_coords, panjang)
+
+    coord_map = {(c['box']['produk'], c['box']['customer']): c for c in best_coords}
+
+    final_output = []
+    for i, box in enumerate(boxes):
+        key = (box['produk'], box['customer'])
+        detail = next((d for d in unloading_details if d['produk'] == box['produk'] and d['customer'] == box['customer']), {})
+
+        if key in coord_map:
+            c = coord_map[key]
+            x, y, z = c['x'], c['y'], c['z']
+            dx, dy, dz = box['lebar'], box['panjang'], box['tinggi']
+            status = "Keluar batas kontainer" if (x + dx > lebar or y + dy > panjang or z + dz > tinggi) else "Valid"
+        else:
+            x = y = z = "-"
+            status = "Tidak disusun"
+
+        final_output.append({
+            "#": i + 1,
+            "Produk": box['produk'],
+            "Customer": box['customer'],
+            "X": x, "Y": y, "Z": z,
+            "Urutan": box['urutan'],
+            "Berat (kg)": box['berat'],
+            "Jarak Horizontal (cm)": detail.get("jarak_horizontal_cm", "-"),
+            "Jarak Vertikal (cm)": detail.get("jarak_vertikal_cm", "-"),
+            "Jarak Tempuh (cm)": detail.get("jarak_tempuh_cm", "-"),
+            "Waktu Unloading (detik)": detail.get("waktu_unloading_detik", "-"),
+            "Status": status
+        })
+
+    df_result = pd.DataFrame(final_output)
+
+    st.session_state.simulasi_selesai = True
+    st.session_state.df_result = df_result
+    st.session_state.df_coords = best_coords
+    st.session_state.df_fig = visualisasi_penyusunan(best_coords, panjang, lebar, tinggi)
+    st.session_state.total_unloading_time = total_unloading_time
+    st.session_state.df_dimensi = dimensi
+
 st.title("🚛 Simulasi Penyusunan Barang di Kontainer")
 
 params = render_sidebar_inputs()
@@ -33,77 +77,116 @@ if st.button("Jalankan Simulasi"):
         if not boxes:
             st.error("Tidak ada data barang yang valid!")
         else:
-            pop = generate_population(len(boxes))
-            best, best_fit, best_coords = None, -1e9, []
-
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-            for gen in range(params['max_generasi']):
-                start_time = time.time()
-                results = [evaluate(ind, boxes) for ind in pop]
-                fitnesses = [r[0] for r in results]
-                coords_list = [r[1] for r in results]
-
-                for i, f in enumerate(fitnesses):
-                    if f > best_fit:
-                        best_fit = f
-                        best = pop[i]
-                        best_coords = coords_list[i]
-
-                pop = [mutate(crossover(roulette_selection(pop, fitnesses), roulette_selection(pop, fitnesses))) for _ in range(params['max_populasi'])]
-
-                progress = (gen + 1) / params['max_generasi']
-                progress_bar.progress(progress)
-                status_text.text(f"Generasi {gen + 1}/{params['max_generasi']}, Fitness: {best_fit:.4f}, Waktu: {time.time() - start_time:.2f} detik")
-
-            st.success(f"✅ Simulasi selesai. Fitness terbaik: {best_fit:.4f}")
-
-            total_unloading_time, unloading_details = calculate_unloading_time(best_coords, panjang)
-
-            coord_map = {(c['box']['produk'], c['box']['customer']): c for c in best_coords}
-
-            final_output = []
-            for i, box in enumerate(boxes):
-                key = (box['produk'], box['customer'])
-                detail = next((d for d in unloading_details if d['produk'] == box['produk'] and d['customer'] == box['customer']), {})
-
-                if key in coord_map:
-                    c = coord_map[key]
-                    x, y, z = c['x'], c['y'], c['z']
-                    dx, dy, dz = box['lebar'], box['panjang'], box['tinggi']
-                    status = "Keluar batas kontainer" if (x + dx > lebar or y + dy > panjang or z + dz > tinggi) else "Valid"
-                else:
-                    x = y = z = "-"
-                    status = "Tidak disusun"
-
-                final_output.append({
-                    "#": i + 1,
-                    "Produk": box['produk'],
-                    "Customer": box['customer'],
-                    "X": x, "Y": y, "Z": z,
-                    "Urutan": box['urutan'],
-                    "Berat (kg)": box['berat'],
-                    "Jarak Horizontal (cm)": detail.get("jarak_horizontal_cm", "-"),
-                    "Jarak Vertikal (cm)": detail.get("jarak_vertikal_cm", "-"),
-                    "Jarak Tempuh (cm)": detail.get("jarak_tempuh_cm", "-"),
-                    "Waktu Unloading (detik)": detail.get("waktu_unloading_detik", "-"),
-                    "Status": status
-                })
-
-            df_result = pd.DataFrame(final_output)
-
-            st.session_state.simulasi_selesai = True
-            st.session_state.df_result = df_result
-            st.session_state.df_coords = best_coords
-            st.session_state.df_fig = visualisasi_penyusunan(best_coords, panjang, lebar, tinggi)
-            st.session_state.total_unloading_time = total_unloading_time
+            kelayakan = analisis_kelayakan(boxes)
+            if not kelayakan['layak']:
+                for p in kelayakan['pesan']:
+                    st.warning(f"⚠️ {p}")
+                st.warning(f"⚠️ Butuh minimal {kelayakan['min_kontainer']} kontainer, sebagian barang tidak akan tersusun.")
+
+            if params['pareto']:
+                pop = generate_population(len(boxes))
+                F, gagal = evaluasi_populasi_objektif(pop, boxes)
+
+                progress_bar = st.progress(0)
+                status_text = st.empty()
+
+                for gen in range(params['max_generasi']):
+                    start_time = time.time()
+                    pop, F, gagal = nsga2_generasi(pop, F, gagal, boxes)
+
+                    progress = (gen + 1) / params['max_generasi']
+                    progress_bar.progress(progress)
+                    status_text.text(f"Generasi {gen + 1}/{params['max_generasi']}, Utilisasi volume terbaik: {-F[:, 0].min():.4f}, Waktu: {time.time() - start_time:.2f} detik")
+
+                front = pareto_front(pop, F, gagal)
+                st.success(f"✅ Simulasi selesai. {len(front)} solusi di Pareto front.")
+
+                st.session_state.simulasi_selesai = False
+                st.session_state.pareto_front = front
+                st.session_state.pareto_boxes = boxes
+                st.session_state.pareto_params = dict(params)
+                st.session_state.pareto_pilihan = None
+            else:
+                st.session_state.pareto_front = None
+                pop = generate_population(len(boxes))
+                best, best_fit = None, -1e9
+                arsip = buat_arsip_surrogate(boxes) if params['surrogate'] else None
+                fitnesses = None
+                total_penuh = total_pasangan = total_beda = 0
+
+                progress_bar = st.progress(0)
+                status_text = st.empty()
+
+                for gen in range(params['max_generasi']):
+                    start_time = time.time()
+                    # Hanya fitness yang dihitung per individu, koordinat dibangun sekali untuk individu terbaik
+                    if arsip is not None:
+                        # Offspring dibuat dan disaring surrogate di dalam generasi_dua_tahap
+                        pop, fitnesses, info = generasi_dua_tahap(pop, fitnesses, boxes, arsip)
+                        total_penuh += info['evaluasi_penuh']
+                        total_pasangan += info['pasangan']
+                        total_beda += info['pasangan_beda']
+                    else:
+                        fitnesses = [evaluate_fitness(ind, boxes) for ind in pop]
+
+                    for i, f in enumerate(fitnesses):
+                        if f > best_fit:
+                            best_fit = f
+                            best = pop[i]
+
+                    if arsip is None:
+                        pop = [mutate(crossover(roulette_selection(pop, fitnesses), roulette_selection(pop, fitnesses))) for _ in range(params['max_populasi'])]
+
+                    progress = (gen + 1) / params['max_generasi']
+                    progress_bar.progress(progress)
+                    status_text.text(f"Generasi {gen + 1}/{params['max_generasi']}, Fitness: {best_fit:.4f}, Waktu: {time.time() - start_time:.2f} detik")
+
+                    # Berhenti jika fitness sudah mencapai batas atas yang bisa dibuktikan
+                    if best_fit >= kelayakan['batas_atas_fitness'] - 1e-9:
+                        progress_bar.progress(1.0)
+                        st.info(f"Fitness mencapai batas atas ({kelayakan['batas_atas_fitness']:.4f}), GA berhenti di generasi {gen + 1}.")
+                        break
+
+                st.success(f"✅ Simulasi selesai. Fitness terbaik: {best_fit:.4f}")
+
+                _, best_coords = evaluate(best, boxes)
+
+                if arsip is not None:
+                    beda = total_beda / total_pasangan * 100 if total_pasangan else 0
+                    st.info(f"Surrogate: {total_penuh} evaluasi penuh, urutan surrogate berbeda dari fitness exact pada {beda:.1f}% pasangan.")
+
+                simpan_hasil(best_coords, boxes, params['dimensi'])
+
+if st.session_state.get("pareto_front"):
+    front = st.session_state.pareto_front
+
+    st.subheader("🎯 Pareto Front")
+    df_front = pd.DataFrame([{
+        "Solusi": i + 1,
+        "Utilisasi Volume": round(s['utilisasi_volume'], 4),
+        "Penalty LIFO": round(s['penalty_lifo'], 1),
+        "Waktu Unloading (detik)": round(s['waktu_unloading'], 2),
+        "Tidak Tersusun": s['tidak_tersusun']
+    } for i, s in enumerate(front)])
+    st.dataframe(df_front, use_container_width=True, hide_index=True)
+
+    pilihan = st.selectbox("Pilih solusi trade-off:", range(len(front)), format_func=lambda i: f"Solusi {i + 1}")
+    if pilihan != st.session_state.pareto_pilihan:
+        # Susun ulang dengan parameter saat simulasi dijalankan, bukan isi sidebar sekarang,
+        # supaya koordinat sesuai dengan objektif di tabel
+        run_params = st.session_state.pareto_params
+        set_params(run_params)
+        _, coords = evaluate(front[pilihan]['individu'], st.session_state.pareto_boxes)
+        set_params(params)
+        simpan_hasil(coords, st.session_state.pareto_boxes, run_params['dimensi'])
+        st.session_state.pareto_pilihan = pilihan
 
 if st.session_state.get("simulasi_selesai", False):
     df_result = st.session_state.df_result
     best_coords = st.session_state.df_coords
     fig = st.session_state.df_fig
     total_unloading_time = st.session_state.total_unloading_time
+    panjang, lebar, tinggi = st.session_state.df_dimensi
 
     st.subheader("📦 Visualisasi 3D")
     st.pyplot(fig)
@@ -3,6 +3,8 @@ import numpy as np
 import streamlit as st
 import pandas as pd
 import os
+import heapq
+import threading
 
 # Global parameters
 params = {
@@ -11,7 +13,12 @@ params = {
     'crossover_prob': 0.95,
     'mutasi_prob': 0.01,
     'dimensi': (300, 150, 150),  # Y (panjang), X (lebar), Z (tinggi)
-    'max_berat': 5000
+    'max_berat': 5000,
+    'rasio_dukungan': 0.75,  # minimal bagian alas box yang harus ditopang
+    'maks_beban_tumpuk': None,  # beban maksimal (kg) di atas tiap box, None = tanpa batas
+    'surrogate': False,
+    'surrogate_fraksi': 0.3,
+    'pareto': False
 }
 
 def set_params(new_params):
@@ -62,43 +69,240 @@ def load_data(selected_items):
             return []
     return box_instances
 
+def analisis_kelayakan(boxes, container_dims=None):
+    """
+    Analisis cepat sebelum optimasi:
+    - Total volume dan berat dibandingkan kapasitas kontainer
+    - Batas bawah jumlah kontainer (volume, berat, dan per sumbu)
+    - Batas atas fitness yang bisa dicapai `evaluate`, dipakai sebagai kondisi berhenti GA
+    """
+    panjang_container, lebar_container, tinggi_container = container_dims or params['dimensi']
+    container_volume = panjang_container * lebar_container * tinggi_container
 
-
-def true_lifo_packing(boxes, container_dims):
+    total_volume = sum(b['panjang'] * b['lebar'] * b['tinggi'] for b in boxes)
+    total_berat = sum(b['berat'] for b in boxes)
+
+    # Batas bawah kontinu jumlah kontainer
+    bound_volume = int(np.ceil(total_volume / container_volume)) if container_volume > 0 else 0
+    bound_berat = int(np.ceil(total_berat / params['max_berat'])) if params['max_berat'] > 0 else 0
+
+    # Batas per sumbu: box yang lebih dari setengah dimensi kontainer pada satu sumbu
+    # tidak bisa berdampingan di sumbu itu, jadi proyeksinya di dua sumbu lain tidak boleh tumpang tindih
+    sumbu = [
+        ('panjang', panjang_container, 'lebar', 'tinggi', lebar_container * tinggi_container),
+        ('lebar', lebar_container, 'panjang', 'tinggi', panjang_container * tinggi_container),
+        ('tinggi', tinggi_container, 'panjang', 'lebar', panjang_container * lebar_container),
+    ]
+    bound_sumbu = {}
+    for nama, batas, a, b, luas_penampang in sumbu:
+        luas = sum(box[a] * box[b] for box in boxes if box[nama] * 2 > batas)
+        bound_sumbu[nama] = int(np.ceil(luas / luas_penampang)) if luas_penampang > 0 else 0
+
+    min_kontainer = max([bound_volume, bound_berat] + list(bound_sumbu.values()))
+
+    # Batas atas fitness (lihat `evaluate`): 0.7 * volume_ratio * stability + 0.3 * lifo_score
+    # Penalty LIFO minimum tiap box: jarak terdekat pusat Y box ke posisi idealnya
+    # (pusat Y hanya bisa berada di [panjang/2, panjang_container - panjang/2])
+    min_lifo_box = []
+    for box in boxes:
+        expected_y = (4 - box['urutan']) / 3 * panjang_container
+        y_min = box['panjang'] / 2
+        y_max = panjang_container - box['panjang'] / 2
+        min_lifo_box.append(max(0, y_min - expected_y, expected_y - y_max))
+    min_lifo_box.sort(reverse=True)
+    volume_box = sorted(b['panjang'] * b['lebar'] * b['tinggi'] for b in boxes)
+
+    # Jika k box gagal disusun: penalty >= 1000k, volume terpakai paling banyak total dikurangi
+    # k box terkecil, dan penalty LIFO paling sedikit total dikurangi k penalty minimum terbesar.
+    # k = 0 hanya mungkin jika cukup satu kontainer. Box pertama selalu tersusun (load_data
+    # menjamin tiap box muat dan kontainer masih kosong), jadi k <= n - 1.
+    batas_atas_fitness = 0
+    for k in range(0 if min_kontainer <= 1 else 1, max(len(boxes), 1)):
+        volume_ratio = min(total_volume - sum(volume_box[:k]), container_volume) / container_volume if container_volume > 0 else 0
+        lifo_penalty = sum(min_lifo_box[k:])
+        batas = 0.7 * volume_ratio / (1 + 1000 * k * 0.001) + 0.3 / (1 + lifo_penalty * 0.001)
+        batas_atas_fitness = max(batas_atas_fitness, batas)
+
+    pesan = []
+    if total_volume > container_volume:
+        pesan.append(f"Total volume barang ({total_volume:,}) melebihi volume kontainer ({container_volume:,})")
+    if total_berat > params['max_berat']:
+        pesan.append(f"Total berat barang ({total_berat:,} kg) melebihi batas berat ({params['max_berat']:,} kg)")
+    for nama, n in bound_sumbu.items():
+        if n > 1:
+            pesan.append(f"Box dengan {nama} > setengah {nama} kontainer butuh minimal {n} kontainer")
+
+    return {
+        'layak': min_kontainer <= 1,
+        'total_volume': total_volume,
+        'total_berat': total_berat,
+        'volume_kontainer': container_volume,
+        'min_kontainer': min_kontainer,
+        'bound_volume': bound_volume,
+        'bound_berat': bound_berat,
+        'bound_sumbu': bound_sumbu,
+        'batas_atas_fitness': batas_atas_fitness,
+        'pesan': pesan
+    }
+
+
+
+def buat_height_map(lebar_container, panjang_container):
     """
-    True LIFO packing: 
-    - Urutan tertinggi (keluar terakhir) diletakkan dari belakang kontainer (Y max)
-    - Urutan menengah dilanjutkan di depannya
-    - Urutan terendah diletakkan paling depan (Y kecil)
+    Height map (skyline) lantai kontainer dengan resolusi 1 cm:
+    - tinggi[x, y]: tinggi permukaan teratas di sel (x, y)
+    - atas[x, y]: index box yang permukaannya teratas di sel itu (-1 = lantai)
+    Per box yang sudah ditempatkan disimpan beban yang ditanggung, kapasitasnya,
+    puncak (z + tinggi), dan tumpuannya [(index box di bawah, luas kontak)].
+    """
+    return {
+        'tinggi': np.zeros((lebar_container, panjang_container), dtype=np.int32),
+        'atas': np.full((lebar_container, panjang_container), -1, dtype=np.int32),
+        'beban': [],
+        'kapasitas': [],
+        'puncak': [],
+        'tumpuan': []
+    }
+
+def reset_height_map(hm):
+    hm['tinggi'].fill(0)
+    hm['atas'].fill(-1)
+    for key in ('beban', 'kapasitas', 'puncak', 'tumpuan'):
+        hm[key].clear()
+
+def cek_dukungan(hm, x, y, dx, dy, z, dengan_tumpuan=True):
+    """
+    Rasio luas alas box yang ditopang (lantai atau permukaan box lain tepat di z),
+    beserta daftar tumpuan [(index box, luas kontak)]. Waktu sebanding luas alas.
+    Daftar tumpuan hanya dihitung jika `dengan_tumpuan` (dibutuhkan untuk cek beban).
+    """
+    if z == 0:
+        return 1.0, []
+    kontak = hm['tinggi'][x:x + dx, y:y + dy] == z
+    luas = np.count_nonzero(kontak)
+    if luas == 0 or not dengan_tumpuan:
+        return luas / (dx * dy), []
+    ids, counts = np.unique(hm['atas'][x:x + dx, y:y + dy][kontak], return_counts=True)
+    return luas / (dx * dy), list(zip(ids.tolist(), counts.tolist()))
+
+def sebar_beban(hm, tumpuan, berat):
+    """
+    Tambahan beban {index box: kg} pada semua box di bawah jika box seberat `berat`
+    diletakkan di atas `tumpuan`. Beban dibagi sebanding luas kontak dan diteruskan
+    ke bawah (dari puncak tertinggi dulu, jadi tiap box hanya diproses sekali).
+    Return None jika ada box yang melebihi kapasitasnya.
+    """
+    tambahan = {}
+    total_luas = sum(luas for _, luas in tumpuan)
+    for j, luas in tumpuan:
+        tambahan[j] = tambahan.get(j, 0) + berat * luas / total_luas
+
+    antrian = [(-hm['puncak'][j], j) for j in tambahan]
+    heapq.heapify(antrian)
+    diproses = set()
+    while antrian:
+        _, j = heapq.heappop(antrian)
+        if j in diproses:
+            continue
+        diproses.add(j)
+        if hm['beban'][j] + tambahan[j] > hm['kapasitas'][j]:
+            return None
+        bawah = hm['tumpuan'][j]
+        if bawah:
+            total_luas = sum(luas for _, luas in bawah)
+            for k, luas in bawah:
+                tambahan[k] = tambahan.get(k, 0) + tambahan[j] * luas / total_luas
+                heapq.heappush(antrian, (-hm['puncak'][k], k))
+    return tambahan
+
+def tempatkan_height_map(hm, x, y, dx, dy, z, dz, kapasitas, tumpuan, tambahan):
+    """
+    Catat box baru di height map (index = urutan penempatan) dan tambahkan bebannya ke box di bawah.
+    `z` harus puncak skyline di bawah alas box, jadi seluruh alas menjadi permukaan teratas.
+    """
+    j = len(hm['beban'])
+    hm['tinggi'][x:x + dx, y:y + dy] = z + dz
+    hm['atas'][x:x + dx, y:y + dy] = j
+    hm['beban'].append(0)
+    hm['kapasitas'].append(kapasitas)
+    hm['puncak'].append(z + dz)
+    hm['tumpuan'].append(tumpuan)
+    for k, w in tambahan.items():
+        hm['beban'][k] += w
+
+# Buffer scratch yang dipakai ulang antar evaluasi, supaya evaluasi fitness
+# tidak membuat list dict koordinat baru untuk setiap individu.
+# Disimpan per thread: Streamlit menjalankan tiap sesi di thread sendiri dengan
+# modul `main` yang sama, jadi simulasi yang berjalan bersamaan tidak saling menimpa.
+_lokal = threading.local()
+
+def _siapkan_scratch(n, container_dims):
+    buf = getattr(_lokal, 'scratch', None)
+    if buf is None:
+        buf = _lokal.scratch = {'n': 0, 'volume_ratio': 0, 'idx': [], 'x': [], 'y': [], 'z': [], 'dx': [], 'dy': [], 'dz': [], 'hm': None}
+    if len(buf['idx']) < n:
+        for key in ('idx', 'x', 'y', 'z', 'dx', 'dy', 'dz'):
+            buf[key] = [0] * n
+    panjang_container, lebar_container, _ = container_dims
+    if buf['hm'] is None or buf['hm']['tinggi'].shape != (lebar_container, panjang_container):
+        buf['hm'] = buat_height_map(lebar_container, panjang_container)
+    else:
+        reset_height_map(buf['hm'])
+    buf['n'] = 0
+    return buf
+
+def materialize_coords(boxes, buf):
+    """Bangun list koordinat (format `coords`) dari isi buffer scratch."""
+    return [{
+        'box': boxes[buf['idx'][j]],
+        'x': buf['x'][j],
+        'y': buf['y'][j],
+        'z': buf['z'][j]
+    } for j in range(buf['n'])]
+
+def _true_lifo_packing_scratch(boxes, container_dims):
+    """
+    Inti true LIFO packing. Posisi box disimpan di buffer scratch (bukan list dict),
+    hasilnya (fitness, buffer). Buffer hanya valid sampai pemanggilan berikutnya.
     """
     panjang_container, lebar_container, tinggi_container = container_dims
-
-    coords = []
+    debug = st.session_state.get('debug_mode', False)
+
+    buf = _siapkan_scratch(len(boxes), container_dims)
+    b_idx, b_x, b_y, b_z = buf['idx'], buf['x'], buf['y'], buf['z']
+    b_dx, b_dy, b_dz = buf['dx'], buf['dy'], buf['dz']
+    hm = buf['hm']
+    hm_tinggi = hm['tinggi']
+    rasio_dukungan = params['rasio_dukungan']
+    maks_beban = params['maks_beban_tumpuk'] or float('inf')
+    # Beban hanya perlu dilacak jika kapasitasnya dibatasi
+    cek_beban = maks_beban != float('inf')
+    n = 0
     penalty = 0
     total_volume = 0
     total_berat = 0
 
-    # Group boxes berdasarkan urutan
+    # Group index box berdasarkan urutan
     urutan_groups = {}
-    for box in boxes:
+    for i, box in enumerate(boxes):
         urutan = box['urutan']
         if urutan not in urutan_groups:
             urutan_groups[urutan] = []
-        urutan_groups[urutan].append(box)
+        urutan_groups[urutan].append(i)
 
     # Sort tiap grup berdasarkan volume terbesar dulu
     for urutan in urutan_groups:
-        urutan_groups[urutan].sort(key=lambda x: x['volume'], reverse=True)
+        urutan_groups[urutan].sort(key=lambda i: boxes[i]['volume'], reverse=True)
 
     # Debug awal
-    if st.session_state.get('debug_mode', False):
+    if debug:
         st.write(f"Container dims: {container_dims}")
         for urutan in sorted(urutan_groups.keys(), reverse=True):
             st.write(f"Urutan {urutan}: {len(urutan_groups[urutan])} boxes")
 
     # Tentukan awal Y dari belakang (untuk urutan tertinggi)
     max_urutan = max(urutan_groups.keys())
-    max_box_length = max(b['panjang'] for b in urutan_groups[max_urutan])
+    max_box_length = max(boxes[i]['panjang'] for i in urutan_groups[max_urutan])
     if max_box_length > panjang_container:
         st.warning(f"⚠️ Panjang box terbesar ({max_box_length}) melebihi panjang kontainer!")
         current_y_back = 0
@@ -108,104 +312,102 @@ def true_lifo_packing(boxes, container_dims):
     # Proses per urutan (mulai dari tertinggi = paling belakang)
     for urutan in sorted(urutan_groups.keys(), reverse=True):
         boxes_in_urutan = urutan_groups[urutan]
+        placed_count = 0
 
-        if st.session_state.get('debug_mode', False):
+        if debug:
             st.write(f"=== Processing Urutan {urutan} ===")
             st.write(f"Starting from Y position: {current_y_back}")
             st.write(f"Boxes to place: {len(boxes_in_urutan)}")
 
-        layer_z = 0
         layer_x = 0
         row_y = current_y_back
 
-        for i, box in enumerate(boxes_in_urutan):
+        for i, box_idx in enumerate(boxes_in_urutan):
+            box = boxes[box_idx]
             dx, dy, dz = box['lebar'], box['panjang'], box['tinggi']
             placed = False
 
-            for z_try in range(layer_z, tinggi_container - dz + 1, dz):
-                start_y = max(0, row_y - dy)
-                for y_try in range(start_y, -1, -dy):
-                    for x_try in range(layer_x, lebar_container - dx + 1, dx):
-                        if (x_try + dx > lebar_container or
-                            y_try + dy > panjang_container or
-                            z_try + dz > tinggi_container):
-                            continue
+            # Posisi z diambil dari skyline: box diletakkan di atas titik tertinggi di bawah alasnya,
+            # jadi tidak mungkin bertabrakan dan tidak perlu scan semua box yang sudah tersusun
+            start_y = max(0, row_y - dy)
+            for y_try in range(start_y, -1, -dy):
+                if y_try + dy > panjang_container:
+                    continue
+                for x_try in range(layer_x if y_try == start_y else 0, lebar_container - dx + 1, dx):
+                    z_try = int(hm_tinggi[x_try:x_try + dx, y_try:y_try + dy].max())
+                    if z_try + dz > tinggi_container:
+                        continue
 
-                        conflict = False
-                        for c in coords:
-                            if not (x_try + dx <= c['x'] or x_try >= c['x'] + c['box']['lebar'] or
-                                    y_try + dy <= c['y'] or y_try >= c['y'] + c['box']['panjang'] or
-                                    z_try + dz <= c['z'] or z_try >= c['z'] + c['box']['tinggi']):
-                                conflict = True
-                                break
-
-                        if not conflict:
-                            coords.append({
-                                'box': box,
-                                'x': x_try,
-                                'y': y_try,
-                                'z': z_try
-                            })
-                            total_volume += dx * dy * dz
-                            total_berat += box['berat']
-                            placed = True
-
-                            if st.session_state.get('debug_mode', False) and i < 5:
-                                st.write(f"  Box {i+1}: {box['produk']} placed at ({x_try}, {y_try}, {z_try})")
-
-                            if x_try + dx + dx <= lebar_container:
-                                layer_x = x_try + dx
-                            elif z_try + dz + dz <= tinggi_container:
-                                layer_x = 0
-                                layer_z = z_try + dz
-                            else:
-                                layer_x = 0
-                                layer_z = 0
-                                row_y = y_try
+                    # Box harus ditopang lantai/box lain dan box di bawah harus kuat menahan bebannya
+                    tumpuan, tambahan = [], {}
+                    if z_try > 0:
+                        rasio, tumpuan = cek_dukungan(hm, x_try, y_try, dx, dy, z_try, cek_beban)
+                        if rasio < rasio_dukungan:
+                            continue
+                        if cek_beban:
+                            tambahan = sebar_beban(hm, tumpuan, box['berat'])
+                            if tambahan is None:
+                                continue
+
+                    b_idx[n], b_x[n], b_y[n], b_z[n] = box_idx, x_try, y_try, z_try
+                    b_dx[n], b_dy[n], b_dz[n] = dx, dy, dz
+                    tempatkan_height_map(hm, x_try, y_try, dx, dy, z_try, dz, maks_beban, tumpuan, tambahan)
+                    n += 1
+                    placed_count += 1
+                    total_volume += dx * dy * dz
+                    total_berat += box['berat']
+                    placed = True
+
+                    if debug and i < 5:
+                        st.write(f"  Box {i+1}: {box['produk']} placed at ({x_try}, {y_try}, {z_try})")
+
+                    if x_try + dx + dx <= lebar_container:
+                        layer_x = x_try + dx
+                    elif z_try + dz + dz <= tinggi_container:
+                        layer_x = 0
+                    else:
+                        layer_x = 0
+                        row_y = y_try
 
-                            break
-                    if placed:
-                        break
+                    break
                 if placed:
                     break
 
             if not placed:
-                if st.session_state.get('debug_mode', False):
+                if debug:
                     st.error(f"FAILED to place: {box['produk']} (urutan {urutan})")
                 penalty += 1000
 
         # Update posisi belakang untuk urutan berikutnya
-        if coords:
-            min_y_placed = min([c['y'] for c in coords])
-            current_y_back = min_y_placed
-            if st.session_state.get('debug_mode', False):
+        if n:
+            current_y_back = min(b_y[:n])
+            if debug:
                 st.write(f"Updated current_y_back to: {current_y_back}")
 
-        if st.session_state.get('debug_mode', False):
-            placed_count = len([c for c in coords if c['box']['urutan'] == urutan])
+        if debug:
             st.write(f"Urutan {urutan} completed. Boxes placed: {placed_count}/{len(boxes_in_urutan)}")
 
+    buf['n'] = n
+
     # Penalty berat berlebih
     if total_berat > params['max_berat']:
         penalty += 5000
 
     # Validasi posisi terhadap batas kontainer
     violations = 0
-    for i, coord in enumerate(coords):
-        box = coord['box']
-        x, y, z = coord['x'], coord['y'], coord['z']
-        if (x + box['lebar'] > lebar_container or
-            y + box['panjang'] > panjang_container or
-            z + box['tinggi'] > tinggi_container):
+    for j in range(n):
+        if (b_x[j] + b_dx[j] > lebar_container or
+            b_y[j] + b_dy[j] > panjang_container or
+            b_z[j] + b_dz[j] > tinggi_container):
             violations += 1
-            if st.session_state.get('debug_mode', False):
-                st.error(f"ERROR: Box {i} keluar batas! {box['produk']} at ({x}, {y}, {z})")
+            if debug:
+                st.error(f"ERROR: Box {j} keluar batas! {boxes[b_idx[j]]['produk']} at ({b_x[j]}, {b_y[j]}, {b_z[j]})")
 
     if violations > 0:
         penalty += violations * 10000
-        if st.session_state.get('debug_mode', False):
+        if debug:
             st.warning(f"{violations} box keluar dari batas kontainer.")
-    elif st.session_state.get('debug_mode', False):
+    elif debug:
         st.success("✓ Semua box berada dalam batas kontainer.")
 
     # Hitung skor efisiensi akhir
@@ -213,22 +415,35 @@ def true_lifo_packing(boxes, container_dims):
     volume_ratio = total_volume / container_volume if container_volume > 0 else 0
     stability_score = 1 / (1 + penalty * 0.001)
     fitness = volume_ratio * stability_score
+    # Utilisasi volume murni (tanpa penalty) untuk objektif mode Pareto
+    buf['volume_ratio'] = volume_ratio
 
-    if st.session_state.get('debug_mode', False):
+    if debug:
         st.write(f"=== Final Results ===")
-        st.write(f"Total boxes placed: {len(coords)}/{len(boxes)}")
+        st.write(f"Total boxes placed: {n}/{len(boxes)}")
         st.write(f"Total volume used: {total_volume}")
         st.write(f"Volume ratio: {volume_ratio:.3f}")
         st.write(f"Penalty: {penalty}")
         st.write(f"Fitness: {fitness:.3f}")
         st.write(f"=== LIFO Validation ===")
         for urutan in sorted(urutan_groups.keys()):
-            boxes_urutan = [c for c in coords if c['box']['urutan'] == urutan]
-            if boxes_urutan:
-                avg_y = sum([c['y'] + c['box']['panjang'] / 2 for c in boxes_urutan]) / len(boxes_urutan)
-                st.write(f"Urutan {urutan}: {len(boxes_urutan)} boxes, avg Y position: {avg_y:.1f}")
+            placed_urutan = [j for j in range(n) if boxes[b_idx[j]]['urutan'] == urutan]
+            if placed_urutan:
+                avg_y = sum([b_y[j] + b_dy[j] / 2 for j in placed_urutan]) / len(placed_urutan)
+                st.write(f"Urutan {urutan}: {len(placed_urutan)} boxes, avg Y position: {avg_y:.1f}")
 
-    return fitness, coords
+    return fitness, buf
+
+
+def true_lifo_packing(boxes, container_dims):
+    """
+    True LIFO packing: 
+    - Urutan tertinggi (keluar terakhir) diletakkan dari belakang kontainer (Y max)
+    - Urutan menengah dilanjutkan di depannya
+    - Urutan terendah diletakkan paling depan (Y kecil)
+    """
+    fitness, buf = _true_lifo_packing_scratch(boxes, container_dims)
+    return fitness, materialize_coords(boxes, buf)
 
 
 def simple_lifo_packing(boxes, container_dims):
@@ -324,32 +539,179 @@ def layer_by_layer_packing(boxes, container_dims):
     """
     return true_lifo_packing(boxes, container_dims)
 
-def evaluate(individual, boxes):
-    sorted_boxes = [boxes[i] for i in individual]
-    fitness, coords = layer_by_layer_packing(sorted_boxes, params['dimensi'])
-    
+def _lifo_penalty(buf, boxes):
     # Hitung penalty LIFO berdasarkan posisi Y - simplified
     lifo_penalty = 0
-    for coord in coords:
-        box = coord['box']
-        y_center = coord['y'] + box['panjang'] / 2
-        
+    for j in range(buf['n']):
+        box = boxes[buf['idx'][j]]
+        y_center = buf['y'][j] + box['panjang'] / 2
+
         # Expected position: urutan 3 should be at back (high Y), urutan 1 at front (low Y)
         expected_y_ratio = (4 - box['urutan']) / 3  # urutan 3 -> 1/3, urutan 2 -> 2/3, urutan 1 -> 3/3
         expected_y = expected_y_ratio * params['dimensi'][0]
-        
+
         lifo_penalty += abs(y_center - expected_y)
-    
-    lifo_score = 1 / (1 + lifo_penalty * 0.001)  # reduced penalty factor
-    final_fitness = 0.7 * fitness + 0.3 * lifo_score  # prioritize packing efficiency
-    
-    return final_fitness, coords
 
-def calculate_unloading_time(coords, panjang_container):
+    return lifo_penalty
+
+def _lifo_score(buf, boxes):
+    return 1 / (1 + _lifo_penalty(buf, boxes) * 0.001)  # reduced penalty factor
+
+def _evaluate_scratch(individual, boxes):
+    """Packing + gabungan fitness akhir; return (final_fitness, sorted_boxes, buffer scratch)."""
+    sorted_boxes = [boxes[i] for i in individual]
+    fitness, buf = _true_lifo_packing_scratch(sorted_boxes, params['dimensi'])
+    final_fitness = 0.7 * fitness + 0.3 * _lifo_score(buf, sorted_boxes)  # prioritize packing efficiency
+    return final_fitness, sorted_boxes, buf
+
+def evaluate_fitness(individual, boxes):
+    """
+    Evaluasi fitness saja, tanpa membangun list koordinat.
+    Posisi box hanya ada di buffer scratch; pakai `evaluate` untuk mendapatkan coords.
+    """
+    return _evaluate_scratch(individual, boxes)[0]
+
+def evaluate(individual, boxes):
+    final_fitness, sorted_boxes, buf = _evaluate_scratch(individual, boxes)
+    return final_fitness, materialize_coords(sorted_boxes, buf)
+
+def _kunci_efektif(individual, boxes, tipe):
+    """
+    Urutan tipe box seperti yang benar-benar diproses packing (urutan terbesar dulu,
+    lalu volume terbesar; sort stabil). Kromosom dengan kunci sama pasti fitness-nya sama.
+    """
+    urut = sorted(individual, key=lambda i: (-boxes[i]['urutan'], -boxes[i]['volume']))
+    return tuple(tipe[i] for i in urut)
+
+def buat_arsip_surrogate(boxes, max_arsip=500, max_cache=5000):
+    """
+    Arsip pasangan (kunci kromosom, fitness exact) untuk model surrogate.
+    Data latih dibatasi `max_arsip` entri terbaru, cache exact dibatasi `max_cache`
+    kunci (yang paling lama dimasukkan dibuang lebih dulu).
+    """
+    tipe_map = {}
+    tipe = []
+    for box in boxes:
+        # Semua field box yang mempengaruhi packing/fitness harus masuk kunci tipe
+        key = (box['panjang'], box['lebar'], box['tinggi'], box['berat'], box['volume'], box['urutan'])
+        tipe.append(tipe_map.setdefault(key, len(tipe_map)))
+    return {
+        'tipe': tipe,
+        'n_tipe': len(tipe_map),
+        'cache': {},
+        'X': np.zeros((0, len(boxes)), dtype=np.int32),
+        'y': np.zeros(0),
+        'max_arsip': max_arsip,
+        'max_cache': max_cache
+    }
+
+def _tambah_arsip(arsip, kunci, fitness):
+    arsip['cache'][kunci] = fitness
+    if len(arsip['cache']) > arsip['max_cache']:
+        del arsip['cache'][next(iter(arsip['cache']))]
+    arsip['X'] = np.vstack([arsip['X'], np.array(kunci, dtype=np.int32)])[-arsip['max_arsip']:]
+    arsip['y'] = np.append(arsip['y'], fitness)[-arsip['max_arsip']:]
+
+def _fitur_surrogate(X, n_tipe):
+    # One-hot (posisi, tipe box) dari urutan efektif: fitur = tipe box apa di posisi packing ke-i
+    N, n = X.shape
+    fitur = np.zeros((N, n * n_tipe))
+    fitur[np.arange(N)[:, None], np.arange(n) * n_tipe + X] = 1
+    return fitur
+
+def latih_surrogate(arsip, alpha=1.0):
+    """
+    Ridge regression dari fitur (posisi, tipe box) ke fitness exact di arsip.
+    Diselesaikan dalam bentuk dual (ukuran = jumlah data), jadi tetap murah untuk manifest besar.
+    """
+    fitur = _fitur_surrogate(arsip['X'], arsip['n_tipe'])
+    mean_fitur = fitur.mean(axis=0)
+    mean_y = arsip['y'].mean()
+    Xc = fitur - mean_fitur
+    koef = np.linalg.solve(Xc @ Xc.T + alpha * np.eye(len(Xc)), arsip['y'] - mean_y)
+    return {'w': Xc.T @ koef, 'mean_fitur': mean_fitur, 'mean_y': mean_y, 'n_tipe': arsip['n_tipe']}
+
+def prediksi_surrogate(model, kunci_list):
+    """Prediksi fitness untuk sekumpulan kunci kromosom."""
+    X = np.array(kunci_list, dtype=np.int32).reshape(len(kunci_list), -1)
+    return (_fitur_surrogate(X, model['n_tipe']) - model['mean_fitur']) @ model['w'] + model['mean_y']
+
+def _evaluasi_exact(ind, kunci, boxes, arsip):
+    if kunci not in arsip['cache']:
+        _tambah_arsip(arsip, kunci, evaluate_fitness(ind, boxes))
+        return arsip['cache'][kunci], True
+    return arsip['cache'][kunci], False
+
+def generasi_dua_tahap(pop, fitnesses, boxes, arsip):
+    """
+    Satu generasi GA dengan pre-screening surrogate:
+    1. Buat kandidat offspring sebanyak `max_populasi / surrogate_fraksi`; kandidat yang
+       kuncinya duplikat atau sudah ada di cache dibuang (tidak menambah informasi)
+    2. Surrogate meranking kandidat sisanya, hanya `max_populasi` teratas yang dievaluasi penuh
+    3. Jika kandidat baru kurang, slot sisanya diisi parent terbaik (fitness-nya sudah exact)
+
+    Jika `fitnesses` None (generasi pertama), semua individu `pop` dievaluasi penuh.
+    Return (pop, fitnesses, info); semua fitness yang dikembalikan exact, jadi seleksi
+    tidak pernah memakai nilai prediksi. `info` mencatat seberapa sering urutan surrogate
+    berbeda dari fitness exact.
+    """
+    info = {'evaluasi_penuh': 0, 'pasangan': 0, 'pasangan_beda': 0}
+    if fitnesses is None:
+        fitnesses = []
+        for ind in pop:
+            f, baru = _evaluasi_exact(ind, _kunci_efektif(ind, boxes, arsip['tipe']), boxes, arsip)
+            fitnesses.append(f)
+            info['evaluasi_penuh'] += baru
+        return pop, fitnesses, info
+
+    n_kandidat = int(np.ceil(params['max_populasi'] / params['surrogate_fraksi']))
+    kandidat, dilihat = [], set()
+    for _ in range(n_kandidat):
+        ind = mutate(crossover(roulette_selection(pop, fitnesses), roulette_selection(pop, fitnesses)))
+        k = _kunci_efektif(ind, boxes, arsip['tipe'])
+        if k not in dilihat and k not in arsip['cache']:
+            dilihat.add(k)
+            kandidat.append((ind, k))
+
+    new_pop, new_fit = [], []
+    if kandidat:
+        prediksi = prediksi_surrogate(latih_surrogate(arsip), [k for _, k in kandidat])
+        dinilai = []
+        for i in np.argsort(-prediksi)[:params['max_populasi']]:
+            ind, k = kandidat[i]
+            f, _ = _evaluasi_exact(ind, k, boxes, arsip)
+            new_pop.append(ind)
+            new_fit.append(f)
+            dinilai.append((prediksi[i], f))
+        info['evaluasi_penuh'] = len(dinilai)
+
+        # Ketidaksesuaian surrogate: pasangan yang urutannya terbalik dibanding fitness exact
+        for a in range(len(dinilai)):
+            for b in range(a + 1, len(dinilai)):
+                info['pasangan'] += 1
+                if (dinilai[a][0] - dinilai[b][0]) * (dinilai[a][1] - dinilai[b][1]) < 0:
+                    info['pasangan_beda'] += 1
+
+    # Isi slot yang kosong dengan parent terbaik
+    for i in np.argsort(fitnesses)[::-1][:params['max_populasi'] - len(new_pop)]:
+        new_pop.append(pop[i])
+        new_fit.append(fitnesses[i])
+    return new_pop, new_fit, info
+
+def _waktu_unloading_box(x, z, box):
+    """Jarak horizontal, vertikal, total (cm) dan waktu unloading (detik) satu box di posisi (x, z)."""
     Ws = 5
     Jk = 0
     Xkontainer = 0
     Zkontainer = 0
+    Xawal_box = x + box['lebar'] / 2
+    Zawal_box = z + box['tinggi'] / 2
+    jarak_horizontal = 2 * abs(Xkontainer - Xawal_box)
+    jarak_vertikal = abs(Zawal_box - Zkontainer)
+    jarak_tempuh = jarak_horizontal + jarak_vertikal + Jk
+    return jarak_horizontal, jarak_vertikal, jarak_tempuh, jarak_tempuh * Ws / 100
+
+def calculate_unloading_time(coords, panjang_container):
     total_time = 0
     unloading_details = []
     
@@ -359,12 +721,7 @@ def calculate_unloading_time(coords, panjang_container):
     for i, coord in enumerate(sorted_coords):
         box = coord['box']
         x, y, z = coord['x'], coord['y'], coord['z']
-        Xawal_box = x + box['lebar'] / 2
-        Zawal_box = z + box['tinggi'] / 2
-        jarak_horizontal = 2 * abs(Xkontainer - Xawal_box)
-        jarak_vertikal = abs(Zawal_box - Zkontainer)
-        jarak_tempuh = jarak_horizontal + jarak_vertikal + Jk
-        waktu_unloading = jarak_tempuh * Ws / 100
+        jarak_horizontal, jarak_vertikal, jarak_tempuh, waktu_unloading = _waktu_unloading_box(x, z, box)
         total_time += waktu_unloading
         
         unloading_details.append({
@@ -420,6 +777,122 @@ def mutate(ind):
     new_ind[a], new_ind[b] = new_ind[b], new_ind[a]
     return new_ind
 
+def _waktu_unloading(buf, boxes):
+    # Total waktu unloading seperti `calculate_unloading_time`, langsung dari buffer scratch
+    return sum(_waktu_unloading_box(buf['x'][j], buf['z'][j], boxes[buf['idx'][j]])[3] for j in range(buf['n']))
+
+def evaluate_objektif(individual, boxes):
+    """
+    Vektor objektif untuk mode Pareto (semua diminimalkan):
+    [-utilisasi volume (tanpa penalty), penalty LIFO, total waktu unloading], plus jumlah box yang
+    gagal disusun. Penalty LIFO dan waktu unloading hanya dihitung dari box yang
+    tersusun, jadi jumlah gagal dipakai sebagai constraint di `non_dominated_sort`.
+    """
+    sorted_boxes = [boxes[i] for i in individual]
+    _, buf = _true_lifo_packing_scratch(sorted_boxes, params['dimensi'])
+    objektif = [-buf['volume_ratio'], _lifo_penalty(buf, sorted_boxes), _waktu_unloading(buf, sorted_boxes)]
+    return objektif, len(sorted_boxes) - buf['n']
+
+def non_dominated_sort(F, gagal=None):
+    """
+    Non-dominated sorting (NSGA-II) pada matriks objektif F (N x M, diminimalkan).
+    Jika `gagal` diberikan, dipakai constraint-domination: individu dengan box gagal
+    lebih sedikit selalu mendominasi, objektif hanya dibandingkan jika jumlah gagal sama.
+    Return rank front tiap individu (0 = Pareto front).
+    """
+    F = np.asarray(F, dtype=float)
+    # dominasi[i, j] = True jika i mendominasi j
+    dominasi = (F[:, None, :] <= F[None, :, :]).all(axis=2) & (F[:, None, :] < F[None, :, :]).any(axis=2)
+    if gagal is not None:
+        gagal = np.asarray(gagal)
+        dominasi = (gagal[:, None] < gagal[None, :]) | ((gagal[:, None] == gagal[None, :]) & dominasi)
+    jumlah_dominator = dominasi.sum(axis=0)
+    rank = np.full(len(F), -1)
+    front = 0
+    sisa = np.ones(len(F), dtype=bool)
+    while sisa.any():
+        sekarang = sisa & (jumlah_dominator == 0)
+        rank[sekarang] = front
+        sisa &= ~sekarang
+        jumlah_dominator = jumlah_dominator - dominasi[sekarang].sum(axis=0)
+        front += 1
+    return rank
+
+def crowding_distance(F, rank):
+    """Crowding distance per individu, dihitung terpisah di tiap front."""
+    F = np.asarray(F, dtype=float)
+    jarak = np.zeros(len(F))
+    for front in np.unique(rank):
+        idx = np.where(rank == front)[0]
+        if len(idx) <= 2:
+            jarak[idx] = np.inf
+            continue
+        Ff = F[idx]
+        urut = np.argsort(Ff, axis=0)
+        Fs = np.take_along_axis(Ff, urut, axis=0)
+        rentang = Fs[-1] - Fs[0]
+        rentang[rentang == 0] = 1
+        d = np.zeros_like(Ff)
+        d_urut = np.zeros_like(Fs)
+        d_urut[1:-1] = (Fs[2:] - Fs[:-2]) / rentang
+        d_urut[[0, -1]] = np.inf
+        np.put_along_axis(d, urut, d_urut, axis=0)
+        jarak[idx] = d.sum(axis=1)
+    return jarak
+
+def tournament_selection(pop, rank, jarak):
+    # Binary tournament: rank lebih kecil menang, seri -> crowding distance lebih besar
+    a, b = random.randrange(len(pop)), random.randrange(len(pop))
+    if rank[a] < rank[b] or (rank[a] == rank[b] and jarak[a] > jarak[b]):
+        return pop[a]
+    return pop[b]
+
+def evaluasi_populasi_objektif(pop, boxes):
+    """Matriks objektif F dan vektor jumlah box gagal untuk seluruh populasi."""
+    hasil = [evaluate_objektif(ind, boxes) for ind in pop]
+    return np.array([h[0] for h in hasil]), np.array([h[1] for h in hasil])
+
+def nsga2_generasi(pop, F, gagal, boxes):
+    """
+    Satu generasi NSGA-II: buat offspring, gabungkan dengan parent, lalu pilih
+    `max_populasi` individu berdasarkan rank front (constraint-domination pada
+    jumlah box gagal) dan crowding distance.
+    """
+    rank = non_dominated_sort(F, gagal)
+    jarak = crowding_distance(F, rank)
+    offspring = [mutate(crossover(tournament_selection(pop, rank, jarak), tournament_selection(pop, rank, jarak)))
+                 for _ in range(params['max_populasi'])]
+
+    gabungan = pop + offspring
+    F_offspring, gagal_offspring = evaluasi_populasi_objektif(offspring, boxes)
+    F_gabungan = np.vstack([F, F_offspring])
+    gagal_gabungan = np.concatenate([gagal, gagal_offspring])
+    rank = non_dominated_sort(F_gabungan, gagal_gabungan)
+    jarak = crowding_distance(F_gabungan, rank)
+    terpilih = np.lexsort((-jarak, rank))[:params['max_populasi']]
+    return [gabungan[i] for i in terpilih], F_gabungan[terpilih], gagal_gabungan[terpilih]
+
+def pareto_front(pop, F, gagal):
+    """Individu di front pertama (objektif duplikat hanya diambil sekali), urut utilisasi volume terbaik."""
+    F = np.asarray(F, dtype=float)
+    rank = non_dominated_sort(F, gagal)
+    front = []
+    dilihat = set()
+    for i in np.where(rank == 0)[0]:
+        key = tuple(F[i])
+        if key in dilihat:
+            continue
+        dilihat.add(key)
+        front.append({
+            'individu': pop[i],
+            'utilisasi_volume': -F[i][0],
+            'penalty_lifo': F[i][1],
+            'waktu_unloading': F[i][2],
+            'tidak_tersusun': int(gagal[i])
+        })
+    front.sort(key=lambda s: -s['utilisasi_volume'])
+    return front
+
 # Debug mode toggle (add this to your Streamlit UI)
 def enable_debug_mode():
     """Call this function to enable debug output"""
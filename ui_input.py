@@ -57,6 +57,12 @@ def render_sidebar_inputs():
     max_generasi = st.sidebar.number_input("Jumlah Generasi", min_value=10, max_value=500, value=200, step=10)
     crossover_prob = st.sidebar.slider("Probabilitas Crossover", 0.0, 1.0, 0.95, 0.01)
     mutasi_prob = st.sidebar.slider("Probabilitas Mutasi", 0.0, 1.0, 0.01, 0.01)
+    pareto = st.sidebar.checkbox("Mode Pareto (NSGA-II)", value=False,
+                                 help="Optimasi utilisasi volume, penalty LIFO, dan waktu unloading sekaligus")
+    # Mode Pareto selalu memakai evaluasi penuh, surrogate hanya untuk mode bobot tunggal
+    surrogate = st.sidebar.checkbox("Pre-screening Surrogate", value=False, disabled=pareto,
+                                    help="Tidak tersedia di mode Pareto" if pareto else None)
+    surrogate_fraksi = st.sidebar.slider("Fraksi Evaluasi Penuh", 0.05, 1.0, 0.3, 0.05, disabled=pareto or not surrogate)
 
     st.sidebar.header("🚛 Armada")
     jenis_truk = st.sidebar.selectbox("Jenis Truk", [
@@ -74,13 +80,22 @@ def render_sidebar_inputs():
     # Berat maksimal fix 5 ton (5000 kg) untuk semua truk
     max_berat = 5000
 
+    st.sidebar.header("🧱 Stabilitas Tumpukan")
+    rasio_dukungan = st.sidebar.slider("Minimal Alas Ditopang", 0.0, 1.0, 0.75, 0.05)
+    maks_beban_tumpuk = st.sidebar.number_input("Maks. Beban di Atas Box (kg, 0 = tanpa batas)", min_value=0, value=0, step=10)
+
     return {
         "selected_items": selected_items,
         "max_populasi": max_populasi,
         "max_generasi": max_generasi,
         "crossover_prob": crossover_prob,
         "mutasi_prob": mutasi_prob,
+        "pareto": pareto,
+        "surrogate": surrogate and not pareto,
+        "surrogate_fraksi": surrogate_fraksi,
         "jenis_truk": jenis_truk,
         "dimensi": (panjang, lebar, tinggi),
-        "max_berat": max_berat
+        "max_berat": max_berat,
+        "rasio_dukungan": rasio_dukungan,
+        "maks_beban_tumpuk": maks_beban_tumpuk or None
     }
\ No newline at end of file